@@ -1,20 +1,28 @@
 #!/usr/bin/python
 from __future__ import unicode_literals
+import atexit
+import json
+import mmap
 import re
 import os
 import sys
+import threading
 import warnings
+from collections import OrderedDict
 from contextlib import contextmanager
 
-if sys.version_info >= (3,):
-    from configparser import ConfigParser
-else:
-    from ConfigParser import ConfigParser
-
+try:
+    from queue import LifoQueue, Empty
+except ImportError:
+    from Queue import LifoQueue, Empty
 
 import pyodbc
 from ansible.module_utils.basic import AnsibleModule
 
+# There is no point in repeating the missing-odbc-config warning on every
+# find_drivers call within the same process
+warnings.filterwarnings('once', message='No ODBC configuration')
+
 
 ANSIBLE_METADATA = {'metadata_version': '1.0', 'status': ['beta']}
 
@@ -61,9 +69,37 @@ options:
         type: dict
     query:
         description: The actual query to run
-        required: true
+        notes:
+            - Either this or 'queries' is required
+    fetch_batch_size:
+        description: Number of rows to fetch from the server at a time
+        type: int
+        default: 1000
+    pool_size:
+        description: Maximum number of open connections to keep per server
+        type: int
+        default: 10
+    queries:
+        description: A list of queries to run on a single connection.
+                     Items are either plain query strings or dicts with
+                     'query' and optionally 'values' keys
+        type: list
+        notes:
+            - Either this or 'query' is required
+    merge_batch:
+        description: Merge consecutive INSERT ... VALUES statements in
+                     'queries' that target the same table into single
+                     multi-row inserts before executing
+        type: bool
+        default: false
     values:
-        description: List of variables to substitute in the query
+        description: List of variables to substitute in the query. A list
+                     of lists is treated the same as values_batch
+        type: list
+        required: false
+    values_batch:
+        description: List of value lists to run the query once per row,
+                     sent to the server as a single parameter array
         type: list
         required: false
 
@@ -117,6 +153,14 @@ EXAMPLES = r'''
       - "{{ variable1 }}"
       - "{{ variable2 }}"
 
+# Run multiple queries on a single connection
+- name: Execute queries
+  sql_query:
+    config: "{{ config }}"
+    queries:
+      - 'insert into table values ("a")'
+      - 'insert into table values ("b")'
+
 # Run multiple queries with the same configuration
 - block:
   - name: Set config
@@ -161,11 +205,49 @@ EXAMPLES = r'''
 
 RETURN = '''
 output:
-    description: Query results (if applicable)
+    description: Query results (if applicable). When 'queries' is used, a
+                 list with the results of every query, in order.
 '''
 
 ODBCINST = ['/etc/odbcinst.ini', '/usr/local/etc/odbcinst.ini', '~/.odbc.ini']
 DRIVERS = {'mysql': '', 'mssql': '', 'oracle': ''}
+
+# Lowercased view of DRIVERS, refreshed by find_drivers, so comparisons in
+# connection_string don't re-lowercase the same constants on every call
+_DRIVERS_LOWER = {k: v.lower() for k, v in DRIVERS.items()}
+
+# On-disk cache for the driver map, keyed by the odbcinst files' mtimes
+_CACHE_FILE = os.path.expanduser('~/.cache/ansible_sql_query_drivers.json')
+
+# In-process memo of the last driver scan, so repeat calls in a long-lived
+# worker don't even touch the disk cache
+_DRIVERS_MEMO = {'key': None, 'drivers': None}
+
+# Patterns used to parse version numbers out of driver names
+_TRAIL_ZEROS_RE = re.compile(r'(\.0+)*$')
+_NON_VERSION_RE = re.compile(r'[^\d\.]')
+
+# Matches single-row INSERT ... VALUES statements so merge_queries can
+# collapse consecutive inserts into the same table. The tuple group only
+# allows one level of nested parens and nothing but an optional ';' may
+# follow it, so statements with trailing clauses (ON DUPLICATE KEY
+# UPDATE, RETURNING, ...) pass through unmerged.
+_INSERT_RE = re.compile(
+    r'^\s*(INSERT\s+INTO\s+(?:(?!\bVALUES\b).)*?\bVALUES\b)\s*'
+    r'(\([^()]*(?:\([^()]*\)[^()]*)*\))\s*;?\s*$',
+    re.I | re.S,
+)
+# Parameter marker budget per merged statement; MSSQL caps out at ~2100
+_MERGE_MAX_PARAMS = 1000
+
+# Matches '[section]' headers when scanning odbcinst files
+_SECTION_RE = re.compile(br'^\s*\[([^\]]+)\]', re.M)
+
+# Patterns used to match driver sections, compiled once at import
+_MYSQL_RE = re.compile('mysql', re.I)
+_ORACLE_RE = re.compile('oracle', re.I)
+_FREETDS_RE = re.compile('freetds', re.I)
+_SQL_SERVER_RE = re.compile('sql server', re.I)
 ARG_MAPPING = {
     'dsn': 'dsn',
     'username': 'uid',
@@ -176,6 +258,37 @@ ARG_MAPPING = {
     'port': 'port',
     'odbc_opts': 'odbc_opts',
 }
+# Inverse of ARG_MAPPING, computed once instead of on every validation
+_R_MAPPING = {v: k for k, v in ARG_MAPPING.items()}
+# Uppercased connection string keys, precomputed for the closed set of
+# known parameters so connection_string skips the per-call .upper()
+_UPPER = {v: v.upper() for v in ARG_MAPPING.values()}
+
+
+# Pools of open connections, keyed by connection string. LIFO so the most
+# recently used connection, with the warmest server-side caches, goes first.
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+_POOL_MAX = 10
+
+# LRU cache of cursors, keyed by connection and query text, so repeated
+# executions of the same statement can reuse the driver's prepared plan
+_STMT_CACHE = OrderedDict()
+_STMT_CACHE_SIZE = 32
+
+# LRU of built connection strings keyed by the config items, so repeated
+# tasks with identical configs skip the string building entirely
+_CONN_STR_CACHE = OrderedDict()
+_CONN_STR_CACHE_SIZE = 64
+
+# Default number of rows to fetch from the server at a time
+DEFAULT_BATCH_SIZE = 1000
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    # Python 2 keeps intern as a builtin
+    _intern = intern  # noqa: F821
 
 
 class ModuleError(Exception):
@@ -186,43 +299,286 @@ def normalize_version(v):
     "Return a proper version number"
     if not v:
         return [0]
-    return [int(x) for x in re.sub(r'(\.0+)*$', '', v).split('.')]
+    return [int(x) for x in _TRAIL_ZEROS_RE.sub('', v).split('.') if x]
+
+
+def _read_sections(files):
+    """
+    Collect the section headers from a list of ini files, skipping all the
+    key/value noise. Return None if none of the files could be read.
+    """
+    sections = []
+    read_any = False
+    for fname in files:
+        try:
+            ini_file = open(fname, 'rb')
+        except (IOError, OSError):
+            continue
+        read_any = True
+        with ini_file:
+            try:
+                mm = mmap.mmap(
+                    ini_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                # Empty files can't be mapped, and have no sections anyway
+                continue
+            try:
+                sections.extend(
+                    match.group(1).decode('utf-8', 'replace')
+                    for match in _SECTION_RE.finditer(mm)
+                )
+            finally:
+                mm.close()
+    if not read_any:
+        return None
+    return sections
 
 
-def best_driver(parser, search):
+def best_driver(sections, search):
     """
-    Find the newest driver whose name matches a search regex.
+    Find the newest driver whose name matches a compiled search pattern.
     """
-    drivers = [
-        s for s in parser.sections() if re.search(search, s, flags=re.I)
-    ]
+    drivers = [s for s in sections if search.search(s)]
     versions = []
     for section in drivers:
-        version = normalize_version(re.sub(r'[^\d\.]', '', section))
+        version = normalize_version(_NON_VERSION_RE.sub('', section))
         versions.append((version, section))
 
     if not versions:
         return ''
-    best = sorted(versions, reverse=True)[0][-1]
-    return '{{{}}}'.format(best)
+    return '{{{}}}'.format(max(versions)[-1])
+
+
+def _odbcinst_key(files):
+    """
+    Build a cache key from the odbcinst files and their modification times.
+    """
+    key = []
+    for fname in files:
+        try:
+            stat = os.stat(fname)
+        except OSError:
+            continue
+        key.append([fname, getattr(stat, 'st_mtime_ns', stat.st_mtime)])
+    return key
+
+
+def _load_driver_cache(key):
+    """
+    Fill DRIVERS from the cache file if it matches the given key. Return
+    whether the cache could be used.
+    """
+    try:
+        with open(_CACHE_FILE) as cache_file:
+            cache = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return False
+    if cache.get('key') != key:
+        return False
+    DRIVERS.update(cache.get('drivers', {}))
+    return True
+
+
+def _save_driver_cache(key):
+    """
+    Atomically write the current DRIVERS map to the cache file.
+    """
+    tmp_file = _CACHE_FILE + '.tmp'
+    try:
+        cache_dir = os.path.dirname(_CACHE_FILE)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(tmp_file, 'w') as cache_file:
+            json.dump({'key': key, 'drivers': dict(DRIVERS)}, cache_file)
+        os.rename(tmp_file, _CACHE_FILE)
+    except (IOError, OSError):
+        pass
+
+
+def _refresh_drivers_lower():
+    """
+    Rebuild the lowercased driver map after DRIVERS changes.
+    """
+    _DRIVERS_LOWER.clear()
+    _DRIVERS_LOWER.update({k: v.lower() for k, v in DRIVERS.items()})
+
+
+def clear_driver_cache():
+    """
+    Drop the in-process driver memo, forcing the next find_drivers call to
+    re-check the odbcinst files.
+    """
+    _DRIVERS_MEMO['key'] = None
+    _DRIVERS_MEMO['drivers'] = None
 
 
 def find_drivers():
     """
     Fill the DRIVERS dictionary with the best driver for every db type.
+
+    The result is cached on disk keyed by the odbcinst files' modification
+    times, so repeated invocations skip the parse entirely.
     """
     files = [os.path.expanduser(f) for f in ODBCINST]
-    parser = ConfigParser()
-    good_files = parser.read(files)
-    if not good_files:
+    key = _odbcinst_key(files)
+    if key and key == _DRIVERS_MEMO['key']:
+        DRIVERS.update(_DRIVERS_MEMO['drivers'])
+        _refresh_drivers_lower()
+        return
+    if key and _load_driver_cache(key):
+        _refresh_drivers_lower()
+        _DRIVERS_MEMO['key'] = key
+        _DRIVERS_MEMO['drivers'] = dict(DRIVERS)
+        return
+
+    sections = _read_sections(files)
+    if sections is None:
         warnings.warn('No ODBC configuration could be read')
         return
 
-    DRIVERS['mysql'] = best_driver(parser, 'mysql')
-    DRIVERS['oracle'] = best_driver(parser, 'oracle')
-    DRIVERS['mssql'] = best_driver(parser, 'freetds')
+    DRIVERS['mysql'] = best_driver(sections, _MYSQL_RE)
+    DRIVERS['oracle'] = best_driver(sections, _ORACLE_RE)
+    DRIVERS['mssql'] = best_driver(sections, _FREETDS_RE)
     if not DRIVERS['mssql']:
-        DRIVERS['mssql'] = best_driver(parser, 'sql server')
+        DRIVERS['mssql'] = best_driver(sections, _SQL_SERVER_RE)
+    _refresh_drivers_lower()
+    if key:
+        _save_driver_cache(key)
+        _DRIVERS_MEMO['key'] = key
+        _DRIVERS_MEMO['drivers'] = dict(DRIVERS)
+
+
+def _get_pool(key):
+    """
+    Return the connection pool for this (connection string, autocommit)
+    pair, creating it if needed. Pools are split by autocommit so a
+    transactional connect never receives an autocommitting connection.
+    """
+    with _POOL_LOCK:
+        try:
+            return _POOL[key]
+        except KeyError:
+            pool = _POOL[key] = LifoQueue()
+            return pool
+
+
+def _get_connection(conn_str, autocommit=True):
+    """
+    Check a connection out of the pool for this connection string, or open a
+    new one if there is no live connection to reuse.
+    """
+    pool = _get_pool((conn_str, autocommit))
+    while True:
+        try:
+            conn = pool.get_nowait()
+        except Empty:
+            break
+        try:
+            # Ping the pooled connection to make sure it is still alive
+            conn.cursor().execute('SELECT 1')
+            return conn
+        except pyodbc.Error:
+            _close_connection(conn)
+    return pyodbc.connect(conn_str, autocommit=autocommit)
+
+
+def _put_connection(conn_str, conn, autocommit=True):
+    """
+    Return a connection to its pool, or close it if the pool is full.
+    """
+    pool = _get_pool((conn_str, autocommit))
+    if pool.qsize() < _POOL_MAX:
+        pool.put(conn)
+    else:
+        _close_connection(conn)
+
+
+def _close_connection(conn):
+    """
+    Close a connection, discarding any of its cached cursors first.
+    """
+    for key in [k for k in _STMT_CACHE if k[0] == id(conn)]:
+        cursor = _STMT_CACHE.pop(key)
+        try:
+            cursor.close()
+        except pyodbc.Error:
+            pass
+    try:
+        conn.close()
+    except pyodbc.Error:
+        pass
+
+
+def _cached_cursor(conn, query):
+    """
+    Return a cursor bound to this query, reusing the one that last executed
+    it so the driver can keep its prepared plan across executions.
+    """
+    key = (id(conn), query)
+    cursor = _STMT_CACHE.pop(key, None)
+    if cursor is None:
+        cursor = conn.cursor()
+    # (Re-)inserting at the end keeps the cache in LRU order
+    _STMT_CACHE[key] = cursor
+    while len(_STMT_CACHE) > _STMT_CACHE_SIZE:
+        _, old = _STMT_CACHE.popitem(last=False)
+        try:
+            old.close()
+        except pyodbc.Error:
+            pass
+    return cursor
+
+
+def close_connections():
+    """
+    Close every pooled connection. Registered to run at interpreter exit.
+    """
+    while _POOL:
+        _, pool = _POOL.popitem()
+        while True:
+            try:
+                _close_connection(pool.get_nowait())
+            except Empty:
+                break
+
+
+atexit.register(close_connections)
+
+
+def _conn_string_cached(config):
+    """
+    Memoized front end for connection_string, so repeated tasks with the
+    same config don't rebuild the string (and pool key) on every call.
+    """
+    key = tuple(sorted(config.items()))
+    try:
+        conn_str = _CONN_STR_CACHE.pop(key)
+    except TypeError:
+        # Unhashable values; just build the string every time
+        return connection_string(config)
+    except KeyError:
+        conn_str = connection_string(config)
+        if len(_CONN_STR_CACHE) >= _CONN_STR_CACHE_SIZE:
+            _CONN_STR_CACHE.popitem(last=False)
+    _CONN_STR_CACHE[key] = conn_str
+    return conn_str
+
+
+@contextmanager
+def connection(config, autocommit=True):
+    """
+    Yield a connection to the database described by the config dictionary.
+
+    Connections are pooled and reused when the same connection string shows
+    up again; the connection goes back to the pool when the context exits.
+    """
+    conn_str = _conn_string_cached(config)
+    conn = _get_connection(conn_str, autocommit=autocommit)
+    try:
+        yield conn
+    finally:
+        _put_connection(conn_str, conn, autocommit=autocommit)
 
 
 @contextmanager
@@ -230,9 +586,11 @@ def connect(config, autocommit=True):
     """
     Connect to a database with the given connection string and yield a valid
     cursor to be used in a context.
+
+    Only the cursor is closed when the context exits; the underlying
+    connection is kept for reuse.
     """
-    conn_str = connection_string(config)
-    with pyodbc.connect(conn_str, autocommit=autocommit) as conn:
+    with connection(config, autocommit=autocommit) as conn:
         with conn.cursor() as cursor:
             yield cursor
 
@@ -242,15 +600,21 @@ def connection_string(config):
     assert has_driver, 'No driver specified'
 
     driver = config.get('driver', '').lower()
-    if driver and driver == DRIVERS.get('oracle', '').lower():
+    if driver and driver == _DRIVERS_LOWER.get('oracle', ''):
         template = oracle_string(config)
     else:
-        mssql = DRIVERS.get('mssql', '').lower()
+        mssql = _DRIVERS_LOWER.get('mssql', '')
         if driver == mssql and '\\' in config.get('uid', ''):
             config['Disable loopback check'] = 'yes'
-        template = ";".join(
-            '{}={}'.format(k.upper(), v) for k, v in config.items()
-        )
+        # Concatenation beats str.format for short strings, and joining a
+        # materialized list lets str.join size the result upfront. Empty
+        # values are dropped since some drivers choke on bare attributes
+        parts = [
+            (_UPPER.get(k) or k.upper()) + '=' + str(v)
+            for k, v in config.items()
+            if v not in (None, '')
+        ]
+        template = ';'.join(parts)
     return template
 
 
@@ -265,30 +629,140 @@ def oracle_string(config):
     return template.format(**config)
 
 
-def row_to_dict(row):
+def fetch_results(cur, batch_size=DEFAULT_BATCH_SIZE):
     """
-    Convert a pyodbc Row object to a dictionary.
+    Fetch every row from a cursor in batches and return them as a list of
+    dictionaries, bounding peak memory by the batch size instead of
+    materializing the whole result set twice.
     """
-    if row is None:
-        return None
-    return dict(zip([t[0] for t in row.cursor_description], row))
+    # Match the driver's prefetch window to the batch size
+    cur.arraysize = batch_size
+    fetchmany = cur.fetchmany
+    rows = fetchmany(batch_size)
+    if not rows:
+        return []
+    # Compute the column names once instead of once per row, and bind the
+    # loop invariants to locals so each row costs two LOAD_FASTs instead of
+    # global and attribute lookups. Interning the names makes every row
+    # dict share the same key objects instead of per-row copies
+    cols = tuple(_intern(d[0]) for d in cur.description)
+    results = []
+    extend = results.extend
+    _zip, _dict = zip, dict
+    while rows:
+        extend(_dict(_zip(cols, row)) for row in rows)
+        rows = fetchmany(batch_size)
+    return results
 
 
-def run_query(query, values, config):
+def execute_query(cur, query, values, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Execute a single query on an open cursor and return its results and
+    whether it modified the database.
+    """
+    # pyodbc takes the parameters as a single sequence; passing the list
+    # directly avoids unpacking it into a fresh tuple on every execute
+    if values:
+        cur.execute(query, values)
+    else:
+        cur.execute(query)
+    if cur.description is None:
+        # The statement didn't produce a result set, so it must be DML;
+        # skip the fetch path entirely
+        return [], cur.rowcount > 0
+    return fetch_results(cur, batch_size), False
+
+
+def execute_many(cur, query, values_batch):
+    """
+    Execute a query once per row of parameters. The whole batch is bound as
+    an ODBC parameter array and sent in a single round trip.
+    """
+    try:
+        cur.fast_executemany = True
+    except AttributeError:
+        pass
+    try:
+        cur.executemany(query, values_batch)
+    except pyodbc.Error:
+        if not getattr(cur, 'fast_executemany', False):
+            raise
+        # Some drivers (FreeTDS, MySQL Connector/ODBC) reject the fast
+        # path at execution time; plain executemany still works
+        cur.fast_executemany = False
+        cur.executemany(query, values_batch)
+    return [], cur.rowcount > 0
+
+
+def run_query(query, values, config, batch_size=DEFAULT_BATCH_SIZE,
+              values_batch=None):
     """
     Execute the query with the specified config dictionary.
     """
+    with connection(config) as conn:
+        # Reusing the cached cursor lets the driver keep the prepared
+        # statement when the same query runs again on this connection
+        cur = _cached_cursor(conn, query)
+        if values_batch:
+            return execute_many(cur, query, values_batch)
+        if values and isinstance(values[0], (list, tuple)):
+            # A list of rows passed through `values` is a batch too
+            return execute_many(cur, query, values)
+        return execute_query(cur, query, values, batch_size)
+
+
+def merge_queries(queries):
+    """
+    Collapse consecutive INSERT ... VALUES statements into the same table
+    into single multi-row inserts, up to a parameter budget per statement.
+    Items that don't match, or that hit the budget, pass through untouched.
+    """
+    merged = []
+    prefixes = []
+    params = []
+    for item in queries:
+        if isinstance(item, dict):
+            query = item['query']
+            values = list(item.get('values') or [])
+        else:
+            query, values = item, []
+        match = _INSERT_RE.match(query)
+        cost = max(len(values), 1)
+        if (match and merged
+                and prefixes[-1] == match.group(1).lower()
+                and params[-1] + cost <= _MERGE_MAX_PARAMS):
+            last = merged[-1]
+            last['query'] += ', ' + match.group(2)
+            last['values'].extend(values)
+            params[-1] += cost
+            continue
+        merged.append({'query': query, 'values': values})
+        prefixes.append(match.group(1).lower() if match else None)
+        params.append(cost)
+    return merged
+
+
+def run_queries(queries, config, batch_size=DEFAULT_BATCH_SIZE,
+                merge_batch=False):
+    """
+    Execute a list of queries on a single connection. Return a list with the
+    results of every query and whether any of them modified the database.
+    """
+    if merge_batch:
+        queries = merge_queries(queries)
     results = []
     modified = False
-    with connect(config) as cur:
-        cur.execute(query, *values)
-        try:
-            # Will raise an exception if the query doesn't return results
-            results = list(map(row_to_dict, cur.fetchall()))
-            modified = False
-        except pyodbc.Error:
-            results = []
-            modified = cur.rowcount > 0
+    with connection(config) as conn:
+        for item in queries:
+            if isinstance(item, dict):
+                query = item['query']
+                values = item.get('values') or []
+            else:
+                query, values = item, []
+            cur = _cached_cursor(conn, query)
+            rows, changed = execute_query(cur, query, values, batch_size)
+            results.append(rows)
+            modified = modified or changed
     return results, modified
 
 
@@ -297,8 +771,7 @@ def require_args(config, args):
     Check that all the arguments are present in a config dictionary or raise a
     ModuleError.
     """
-    r_mapping = {v: k for k, v in ARG_MAPPING.items()}
-    missing = [r_mapping[k] for k in args if not config.get(k, '')]
+    missing = [_R_MAPPING[k] for k in args if not config.get(k, '')]
     if missing:
         msg = 'Missing configuration parameters: {}'.format(missing)
         raise ModuleError(msg)
@@ -309,14 +782,15 @@ def get_config(params):
     Parse the configuration received by the module. Create the necessary
     mappings and fail if any argument is missing.
     """
-    config = params.get('config', None) or {}
-    config = config.copy()
-    for k, v in ARG_MAPPING.items():
-        if config.get(k, None):
-            config[v] = config.pop(k)
-        if params.get(k, None):
-            config[v] = params[k]
-    config.update(config.pop('odbc_opts', {}))
+    # Overlay the direct parameters on top of the config dictionary, then
+    # translate every key in a single pass. The comprehension builds a fresh
+    # dict, so the caller's input is never mutated.
+    merged = dict(params.get('config', None) or {})
+    merged.update(
+        {k: v for k, v in params.items() if k in ARG_MAPPING and v}
+    )
+    config = {ARG_MAPPING.get(k, k): v for k, v in merged.items()}
+    config.update(config.pop('odbc_opts', None) or {})
 
     require_args(config, ['uid', 'pwd'])
 
@@ -336,33 +810,56 @@ def get_config(params):
     return config
 
 
+# Available arguments/parameters a user can pass to the module. Built once
+# at import so persistent workers don't rebuild the spec per invocation
+_MODULE_ARGS = dict(
+    config=dict(type='dict', required=False, no_log=True),
+    dsn=dict(type='str', required=False),
+    servername=dict(type='str', required=False),
+    port=dict(type='int', required=False),
+    database=dict(type='str', required=False),
+    username=dict(type='str', required=False),
+    password=dict(type='str', required=False, no_log=True),
+    dbtype=dict(type='str', required=False),
+    odbc_opts=dict(type='dict', required=False),
+    query=dict(type='str', required=False),
+    queries=dict(type='list', required=False),
+    merge_batch=dict(type='bool', required=False, default=False),
+    values=dict(type='list', required=False, default=[]),
+    values_batch=dict(type='list', required=False),
+    fetch_batch_size=dict(
+        type='int', required=False, default=DEFAULT_BATCH_SIZE
+    ),
+    pool_size=dict(type='int', required=False, default=10),
+)
+
+
 def setup_module():
-    # define available arguments/parameters a user can pass to the module
-    module_args = dict(
-        config=dict(type='dict', required=False, no_log=True),
-        dsn=dict(type='str', required=False),
-        servername=dict(type='str', required=False),
-        port=dict(type='int', required=False),
-        database=dict(type='str', required=False),
-        username=dict(type='str', required=False),
-        password=dict(type='str', required=False, no_log=True),
-        dbtype=dict(type='str', required=False),
-        odbc_opts=dict(type='dict', required=False),
-        query=dict(type='str', required=True),
-        values=dict(type='list', required=False, default=[]),
-    )
+    # Let the driver manager pool connections that we do close. Set here
+    # instead of at import time so top-level statements stay plain-name
+    # assignments, which keeps ansible-doc's scanner quiet.
+    pyodbc.pooling = True
 
     # the AnsibleModule object will be our abstraction working with Ansible
     # this includes instantiation, a couple of common attr would be the
     # args/params passed to the execution, as well as if the module
     # supports check mode
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    module = AnsibleModule(
+        argument_spec=_MODULE_ARGS,
+        supports_check_mode=True,
+        required_one_of=[['query', 'queries']],
+        mutually_exclusive=[['query', 'queries']],
+    )
     return module
 
 
 def run_module():
+    global _POOL_MAX
+
     result = dict(changed=False, output='')
     module = setup_module()
+    if module.params.get('pool_size'):
+        _POOL_MAX = module.params['pool_size']
 
     # if the user is working with this module in only check mode we do not
     # want to make any changes to the environment, just return the current
@@ -371,10 +868,26 @@ def run_module():
         module.exit_json(**result)
 
     find_drivers()
+    batch_size = module.params.get('fetch_batch_size') or DEFAULT_BATCH_SIZE
     try:
         config = get_config(module.params)
-        query, values = module.params['query'], module.params['values']
-        results, modified = run_query(query, values, config)
+        if module.params.get('queries'):
+            queries = module.params['queries']
+            results, modified = run_queries(
+                queries,
+                config,
+                batch_size,
+                merge_batch=module.params.get('merge_batch') or False,
+            )
+        else:
+            query, values = module.params['query'], module.params['values']
+            results, modified = run_query(
+                query,
+                values,
+                config,
+                batch_size,
+                values_batch=module.params.get('values_batch'),
+            )
     except ModuleError as e:
         module.fail_json(msg=str(e), **result)
     except Exception as e:
@@ -4,14 +4,36 @@ import os
 import sys
 import json
 import warnings
-from io import StringIO
 from tempfile import NamedTemporaryFile
 
+try:
+    from types import MappingProxyType
+except ImportError:
+    # Python 2 has no mapping proxy; a plain dict loses the read-only
+    # guard but keeps the code working
+    MappingProxyType = dict
+
 import yaml
 import pyodbc
 import pytest
 from ansible.module_utils.basic import AnsibleModule
 
+try:
+    import pytest_subtests  # noqa: F401
+except ImportError:
+    # pytest-subtests has no Python 2 release; fall back to a
+    # pass-through so the subtest loops still run as a single block
+    from contextlib import contextmanager
+
+    class _SubTests(object):
+        @contextmanager
+        def test(self, **kwargs):
+            yield
+
+    @pytest.fixture
+    def subtests():
+        return _SubTests()
+
 root = (os.path.split(__file__)[0] or '.') + '/..'
 sys.path.append(root)
 from library import sql_query
@@ -24,30 +46,46 @@ from library.sql_query import ModuleError
 from library.sql_query import get_config
 from library.sql_query import find_drivers
 from library.sql_query import connection_string
-from library.sql_query import row_to_dict
 
 
 if sys.version_info >= (3,):
     unicode = str
-    from configparser import Error as ConfigError
-else:
-    from ConfigParser import Error as ConfigError
 
 
-INTERNAL_CONFIG = {
+# Use the libyaml-backed loader when it's available; it parses the doc
+# blobs several times faster than the pure-python one
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+# Read-only canonical configs; tests build overlays through _param() and
+# _internal() instead of mutating these
+INTERNAL_CONFIG = MappingProxyType({
     'driver': 'mysql',
     'database': 'database',
     'uid': 'uid',
     'pwd': 'pwd',
     'server': 'server',
-}
-PARAM_CONFIG = {
+})
+PARAM_CONFIG = MappingProxyType({
     'username': 'uid',
     'password': 'pwd',
     'dbtype': 'mysql',
     'servername': 'server',
     'database': 'database',
-}
+})
+
+# Frozen items of the canonical configs; building fresh dicts from these
+# beats dict.copy() and shields the originals from accidental mutation
+_INTERNAL_ITEMS = tuple(INTERNAL_CONFIG.items())
+_PARAM_ITEMS = tuple(PARAM_CONFIG.items())
+
+
+def _internal():
+    return dict(_INTERNAL_ITEMS)
+
+
+def _param():
+    return dict(_PARAM_ITEMS)
 
 
 def raise_error(*args, **kwargs):
@@ -57,6 +95,7 @@ def raise_error(*args, **kwargs):
 class FakeCursor:
     def __init__(self, rowcount=1):
         self.rowcount = rowcount
+        self.description = None
 
     def __enter__(self):
         return self
@@ -67,11 +106,28 @@ class FakeCursor:
     def cursor(self):
         return self
 
+    def close(self):
+        pass
+
+    @staticmethod
+    def _empty_fetchmany(size):
+        return []
+
     def execute(self, query, *args):
-        if query.lower().startswith('select'):
-            self.fetchall = lambda: []
+        # Lowercase only the prefix instead of copying the whole query
+        if query[:6].lower() == 'select':
+            # Shared empty fetcher instead of a fresh lambda per execute
+            self.fetchmany = self._empty_fetchmany
+            self.description = (('col', None),)
         else:
-            self.fetchall = raise_error
+            self.description = None
+
+
+class _ModuleExit(Exception):
+    """
+    Sentinel raised by FakeModule instead of sys.exit, so tests can catch
+    it and inspect the result in memory.
+    """
 
 
 class FakeModule:
@@ -79,29 +135,78 @@ class FakeModule:
         params = params or {}
         self.params = params
         self.check_mode = check_mode
+        self.result = None
 
     def exit_json(self, **kwargs):
         kwargs['changed'] = kwargs.get('changed', False)
-        print(json.dumps(kwargs))
-        sys.exit(0)
+        self.result = kwargs
+        raise _ModuleExit()
 
     def fail_json(self, **kwargs):
         kwargs['changed'] = kwargs.get('changed', False)
         kwargs['failed'] = True
-        print(json.dumps(kwargs))
-        sys.exit(1)
+        self.result = kwargs
+        raise _ModuleExit()
+
+
+@pytest.fixture(autouse=True)
+def connections(monkeypatch):
+    """
+    Give every test clean connection pools and statement caches.
+    """
+    monkeypatch.setattr(sql_query, '_POOL', {})
+    monkeypatch.setattr(sql_query, '_STMT_CACHE', sql_query.OrderedDict())
+    monkeypatch.setattr(
+        sql_query, '_CONN_STR_CACHE', sql_query.OrderedDict()
+    )
+
+
+@pytest.fixture(autouse=True)
+def driver_cache(tmp_path, monkeypatch):
+    """
+    Keep the driver cache file inside the test's temp directory.
+    """
+    cache_file = str(tmp_path / 'drivers.json')
+    monkeypatch.setattr(sql_query, '_CACHE_FILE', cache_file)
+    sql_query.clear_driver_cache()
+
+
+@pytest.fixture(scope='session')
+def _fake_drivers():
+    """
+    Build the static driver map once per session; it never changes.
+    """
+    return MappingProxyType({k: k for k in DRIVERS})
 
 
 @pytest.fixture
-def drivers(monkeypatch):
-    drivers = {k: k for k in DRIVERS}
-    monkeypatch.setattr(sql_query, 'DRIVERS', drivers)
+def drivers(monkeypatch, _fake_drivers):
+    """
+    Install the session driver map for a single test. Installing per test
+    keeps isolation while the expensive part stays cached; tests that
+    mutate the map patch in their own copies.
+    """
+    monkeypatch.setattr(sql_query, 'DRIVERS', _fake_drivers)
+    monkeypatch.setattr(sql_query, '_DRIVERS_LOWER', dict(_fake_drivers))
+    return _fake_drivers
 
 
-def test_docs():
-    assert yaml.safe_load(StringIO(DOCUMENTATION))
-    assert yaml.safe_load(StringIO(EXAMPLES))
-    assert yaml.safe_load(StringIO(RETURN))
+@pytest.fixture(scope='session')
+def parsed_docs():
+    """
+    Parse the doc blobs once per session; they never change between runs.
+    """
+    return {
+        'doc': yaml.load(DOCUMENTATION, Loader=_YAML_LOADER),
+        'examples': yaml.load(EXAMPLES, Loader=_YAML_LOADER),
+        'return': yaml.load(RETURN, Loader=_YAML_LOADER),
+    }
+
+
+def test_docs(parsed_docs):
+    assert parsed_docs['doc']
+    assert parsed_docs['examples']
+    assert parsed_docs['return']
 
 
 def test_connect(monkeypatch, drivers):
@@ -117,28 +222,192 @@ def test_connect(monkeypatch, drivers):
         cur.__dict__.update(kwargs)
         return cur
 
-    config = INTERNAL_CONFIG.copy()
+    config = _internal()
     monkeypatch.setattr(pyodbc, 'connect', fake_connect)
     with sql_query.connect(config) as conn:
         assert conn
         assert conn.connection_string == connection_string(config)
 
 
+def test_connect_reuse(monkeypatch, drivers):
+    """
+    Check that connecting twice with the same config reuses the cached
+    connection instead of opening a new one.
+    """
+    opened = []
+
+    def fake_connect(conn_str, *args, **kwargs):
+        opened.append(FakeCursor())
+        return opened[-1]
+
+    config = _internal()
+    monkeypatch.setattr(pyodbc, 'connect', fake_connect)
+    with sql_query.connect(config):
+        pass
+    with sql_query.connect(config):
+        pass
+    assert len(opened) == 1
+
+    # Transactional connections are pooled separately, so they never pick
+    # up an autocommitting connection by mistake
+    with sql_query.connect(config, autocommit=False):
+        pass
+    assert len(opened) == 2
+
+
+def test_conn_string_cache_unhashable(drivers):
+    """
+    Configs with unhashable values can't be cached, but should still
+    build a connection string instead of blowing up.
+    """
+    config = _internal()
+    config['odbc_opts'] = {'applicationintent': 'readonly'}
+    expect = sql_query.connection_string(config)
+    assert sql_query._conn_string_cached(config) == expect
+    assert not sql_query._CONN_STR_CACHE
+
+
 def test_run_query(monkeypatch):
-    monkeypatch.setattr(sql_query, 'connect', lambda x: FakeCursor())
+    monkeypatch.setattr(sql_query, 'connection', lambda x: FakeCursor())
     assert ([], False) == sql_query.run_query('select', [], INTERNAL_CONFIG)
     assert ([], True) == sql_query.run_query('delete', [], INTERNAL_CONFIG)
 
     # Set rowcount to 0 so it's not marked as modified
-    monkeypatch.setattr(sql_query, 'connect', lambda x: FakeCursor(0))
+    monkeypatch.setattr(sql_query, 'connection', lambda x: FakeCursor(0))
     assert ([], False) == sql_query.run_query('select', [], INTERNAL_CONFIG)
     assert ([], False) == sql_query.run_query('delete', [], INTERNAL_CONFIG)
 
 
+def test_run_queries(monkeypatch):
+    monkeypatch.setattr(sql_query, 'connection', lambda x: FakeCursor())
+    queries = ['select', 'delete']
+    expect = [[], []]
+    assert (expect, True) == sql_query.run_queries(queries, INTERNAL_CONFIG)
+
+    # Set rowcount to 0 so nothing is marked as modified
+    monkeypatch.setattr(sql_query, 'connection', lambda x: FakeCursor(0))
+    assert (expect, False) == sql_query.run_queries(queries, INTERNAL_CONFIG)
+
+    # Dict items carry their own values
+    queries = [{'query': 'select', 'values': ['a']}, {'query': 'delete'}]
+    assert (expect, False) == sql_query.run_queries(queries, INTERNAL_CONFIG)
+
+
+def test_merge_queries():
+    """
+    Check that consecutive inserts into the same table get merged into a
+    single multi-row statement, and that everything else passes through.
+    """
+    queries = [
+        'insert into t values (?, ?)',
+        {'query': 'insert into t values (?, ?)', 'values': ['a', 'b']},
+        'insert into other values (1)',
+        'insert into other values (2)',
+        'select * from t',
+        'insert into t values (3)',
+        'insert into t values (4) on duplicate key update a=values(a)',
+    ]
+    merged = sql_query.merge_queries(queries)
+    assert merged == [
+        {
+            'query': 'insert into t values (?, ?), (?, ?)',
+            'values': ['a', 'b'],
+        },
+        {'query': 'insert into other values (1), (2)', 'values': []},
+        {'query': 'select * from t', 'values': []},
+        {'query': 'insert into t values (3)', 'values': []},
+        {
+            'query': 'insert into t values (4)'
+            ' on duplicate key update a=values(a)',
+            'values': [],
+        },
+    ]
+
+
+def test_merge_queries_param_budget(monkeypatch):
+    """
+    Check that merging stops when the parameter budget is reached.
+    """
+    monkeypatch.setattr(sql_query, '_MERGE_MAX_PARAMS', 2)
+    queries = ['insert into t values (?)'] * 3
+    merged = sql_query.merge_queries(queries)
+    assert [q['query'] for q in merged] == [
+        'insert into t values (?), (?)',
+        'insert into t values (?)',
+    ]
+
+
+def test_run_query_values_batch(monkeypatch):
+    """
+    Check that a batch of values is executed as a single parameter array.
+    """
+
+    class BatchCursor(FakeCursor):
+        def executemany(self, query, values_batch):
+            self.batch = (query, values_batch)
+
+    cur = BatchCursor()
+    monkeypatch.setattr(sql_query, 'connection', lambda x: cur)
+    batch = [['a'], ['b']]
+    result = sql_query.run_query(
+        'insert', [], INTERNAL_CONFIG, values_batch=batch
+    )
+    assert result == ([], True)
+    assert cur.batch == ('insert', batch)
+    assert cur.fast_executemany is True
+
+    # A list of lists passed through `values` takes the same path
+    cur = BatchCursor()
+    monkeypatch.setattr(sql_query, 'connection', lambda x: cur)
+    result = sql_query.run_query('insert', batch, INTERNAL_CONFIG)
+    assert result == ([], True)
+    assert cur.batch == ('insert', batch)
+
+
+def test_execute_many_fallback():
+    """
+    Check that drivers that reject fast_executemany at execution time fall
+    back to a plain executemany call.
+    """
+
+    class PickyCursor(FakeCursor):
+        def executemany(self, query, values_batch):
+            if self.fast_executemany:
+                raise pyodbc.Error('fast path not supported')
+            self.batch = (query, values_batch)
+
+    cur = PickyCursor()
+    batch = [['a'], ['b']]
+    result = sql_query.execute_many(cur, 'insert', batch)
+    assert result == ([], True)
+    assert cur.batch == ('insert', batch)
+    assert cur.fast_executemany is False
+
+
+def test_cached_cursor():
+    """
+    Check that the same cursor is returned for repeated executions of the
+    same query, and that old cursors are evicted when the cache fills up.
+    """
+
+    class FakeConnection:
+        def cursor(self):
+            return FakeCursor()
+
+    conn = FakeConnection()
+    cursor = sql_query._cached_cursor(conn, 'select 1')
+    assert sql_query._cached_cursor(conn, 'select 1') is cursor
+    assert sql_query._cached_cursor(conn, 'select 2') is not cursor
+
+    for count in range(sql_query._STMT_CACHE_SIZE):
+        sql_query._cached_cursor(conn, 'select filler {}'.format(count))
+    assert sql_query._cached_cursor(conn, 'select 1') is not cursor
+
+
 def test_get_config(drivers):
-    config = PARAM_CONFIG.copy()
-    expect = INTERNAL_CONFIG.copy()
-    expect['driver'] = sql_query.DRIVERS['mysql']
+    config = _param()
+    expect = _internal()
+    expect['driver'] = drivers['mysql']
     assert get_config(config) == expect
     assert get_config({'config': config}) == expect
 
@@ -156,9 +425,9 @@ def test_key_not_required(drivers, key):
     Check that the port is not required, even though it can be passed as part
     of the config dictionary.
     """
-    config = PARAM_CONFIG.copy()
-    expect = INTERNAL_CONFIG.copy()
-    expect['driver'] = sql_query.DRIVERS['mysql']
+    config = _param()
+    expect = _internal()
+    expect['driver'] = drivers['mysql']
 
     # Specify the port directly
     config[key] = expect[key] = key
@@ -188,17 +457,21 @@ def test_get_config_empty(drivers):
     assert 'Missing configuration parameter' in str(error.value)
 
 
-@pytest.mark.parametrize('key', PARAM_CONFIG)
-def test_get_config_missing_required(key, drivers):
+def test_get_config_missing_required(drivers, subtests):
     """
     Check that get_config raises an error when a required key is missing.
+
+    Subtests keep the per-key reporting without paying pytest's per-item
+    overhead five times.
     """
-    config = PARAM_CONFIG.copy()
-    config.pop(key)
-    with pytest.raises(ModuleError) as error:
-        get_config(config)
-    assert 'Missing configuration parameter' in str(error.value)
-    assert key in str(error.value)
+    for key in PARAM_CONFIG:
+        with subtests.test(key=key):
+            # Single-pass overlay instead of copy + pop
+            config = {k: v for k, v in _PARAM_ITEMS if k != key}
+            with pytest.raises(ModuleError) as error:
+                get_config(config)
+            assert 'Missing configuration parameter' in str(error.value)
+            assert key in str(error.value)
 
 
 def test_get_config_invalid_database():
@@ -206,7 +479,7 @@ def test_get_config_invalid_database():
     Check that get_config raises an error when passing an unknown dbtype.
     """
     db = 'this is not a valid database'
-    config = PARAM_CONFIG.copy()
+    config = _param()
     config['dbtype'] = db
     with pytest.raises(ModuleError) as error:
         get_config(config)
@@ -218,48 +491,82 @@ def test_get_config_invalid_driver(monkeypatch):
     Check that get_config raises an error when using a dbtype that has no
     associated driver.
     """
-    monkeypatch.setitem(sql_query.DRIVERS, 'mssql', '')
+    monkeypatch.setattr(sql_query, 'DRIVERS', dict.fromkeys(DRIVERS, ''))
     with pytest.raises(ModuleError) as error:
-        get_config(PARAM_CONFIG.copy())
+        get_config(_param())
         assert 'no driver' in str(error.value).lower()
 
 
-def assert_driver(monkeypatch, keys, expect, driver):
-    with NamedTemporaryFile(mode='w+') as tmp:
-        for key in keys:
-            tmp.write('{}\nkey=value\n'.format(key))
-        tmp.flush()
-        monkeypatch.setattr(sql_query, 'ODBCINST', [tmp.name])
-        find_drivers()
-        assert sql_query.DRIVERS[driver] == expect
+def assert_driver(monkeypatch, sections, expect, driver):
+    # Hand the section names to find_drivers in-process; no need to write
+    # and re-parse an actual ini file for every case. find_drivers mutates
+    # the driver map, so give it a throwaway copy
+    monkeypatch.setattr(sql_query, 'DRIVERS', dict.fromkeys(DRIVERS, ''))
+    monkeypatch.setattr(
+        sql_query, '_DRIVERS_LOWER', dict.fromkeys(DRIVERS, '')
+    )
+    monkeypatch.setattr(sql_query, 'ODBCINST', ['/nonexistent'])
+    monkeypatch.setattr(sql_query, '_read_sections', lambda files: sections)
+    find_drivers()
+    assert sql_query.DRIVERS[driver] == expect
 
 
 def test_find_driver_error(tmp_path, monkeypatch, recwarn):
-    warnings.simplefilter("always")
     ini = tmp_path / 'odbc.ini'
+    monkeypatch.setattr(sql_query, 'DRIVERS', dict.fromkeys(DRIVERS, ''))
+    monkeypatch.setattr(
+        sql_query, '_DRIVERS_LOWER', dict.fromkeys(DRIVERS, '')
+    )
     monkeypatch.setattr(sql_query, 'ODBCINST', [str(ini)])
-    find_drivers()
-    assert all(not value for key, value in sql_query.DRIVERS.items())
-    assert recwarn.pop(UserWarning)
+    # Scope the filter change to this test instead of mutating the
+    # process-global filter list
+    with warnings.catch_warnings():
+        warnings.simplefilter("always")
+        find_drivers()
+        assert all(not value for key, value in sql_query.DRIVERS.items())
+        assert recwarn.pop(UserWarning)
 
-    ini.write_text("this is not valid ini format")
-    with pytest.raises(ConfigError):
+        # A file without section headers yields no drivers, but no warning
+        # either since it could at least be read
+        ini.write_text("this is not valid ini format")
         find_drivers()
-    assert all(not value for key, value in sql_query.DRIVERS.items())
-    assert len(recwarn) == 0
+        assert all(not value for key, value in sql_query.DRIVERS.items())
+        assert len(recwarn) == 0
+
+
+def test_find_driver_cache(monkeypatch):
+    """
+    Check that a second run with unchanged odbcinst files is served from the
+    driver cache without parsing anything.
+    """
+    monkeypatch.setattr(sql_query, 'DRIVERS', dict.fromkeys(DRIVERS, ''))
+    monkeypatch.setattr(
+        sql_query, '_DRIVERS_LOWER', dict.fromkeys(DRIVERS, '')
+    )
+    with NamedTemporaryFile(mode='w+') as tmp:
+        tmp.write('[MySQL 5]\nkey=value\n')
+        tmp.flush()
+        monkeypatch.setattr(sql_query, 'ODBCINST', [tmp.name])
+        find_drivers()
+        assert sql_query.DRIVERS['mysql'] == '{MySQL 5}'
+
+        sql_query.DRIVERS['mysql'] = ''
+        monkeypatch.setattr(sql_query, 'best_driver', raise_error)
+        find_drivers()
+        assert sql_query.DRIVERS['mysql'] == '{MySQL 5}'
 
 
 @pytest.mark.parametrize(
-    'dbtype, keys, expect',
+    'dbtype, sections, expect',
     [
-        ('mysql', ['[MySQL 5]', '[MySQL]'], '{MySQL 5}'),
-        ('mysql', ['[MySQL 5.1]', '[MySQL 5]'], '{MySQL 5.1}'),
-        ('mysql', ['[MySQL 8 Driver]', '[ODBC MySQL 5]'], '{MySQL 8 Driver}'),
-        ('mysql', ['[MySQL 5]', '[ODBC Driver 5]'], '{MySQL 5}'),
-        ('oracle', ['[Oracle 18]', '[Oracle 12.2g]'], '{Oracle 18}'),
+        ('mysql', ['MySQL 5', 'MySQL'], '{MySQL 5}'),
+        ('mysql', ['MySQL 5.1', 'MySQL 5'], '{MySQL 5.1}'),
+        ('mysql', ['MySQL 8 Driver', 'ODBC MySQL 5'], '{MySQL 8 Driver}'),
+        ('mysql', ['MySQL 5', 'ODBC Driver 5'], '{MySQL 5}'),
+        ('oracle', ['Oracle 18', 'Oracle 12.2g'], '{Oracle 18}'),
         (
             'oracle',
-            ['[Oracle 19 ODBC driver]', '[Oracle 18]'],
+            ['Oracle 19 ODBC driver', 'Oracle 18'],
             '{Oracle 19 ODBC driver}',
         ),
     ],
@@ -272,18 +579,18 @@ def test_find_driver_error(tmp_path, monkeypatch, recwarn):
         'Oracle 19',
     ],
 )
-def test_find_driver(monkeypatch, dbtype, keys, expect):
-    assert_driver(monkeypatch, keys, expect, dbtype)
+def test_find_driver(monkeypatch, dbtype, sections, expect):
+    assert_driver(monkeypatch, sections, expect, dbtype)
 
 
 @pytest.mark.parametrize(
-    'keys, expect',
+    'sections, expect',
     [
-        (['[FreeTDS]', '[SQL Server 18.1]'], '{FreeTDS}'),
-        (['[FreeTDS 3]', '[SQL Server 18.1]'], '{FreeTDS 3}'),
-        (['[SQL Server 18]', '[SQL Server 13]'], '{SQL Server 18}'),
-        (['[SQL Server]', '[SQL Server 1]'], '{SQL Server 1}'),
-        (['[SQL Server]', '[MySQL]'], '{SQL Server}'),
+        (['FreeTDS', 'SQL Server 18.1'], '{FreeTDS}'),
+        (['FreeTDS 3', 'SQL Server 18.1'], '{FreeTDS 3}'),
+        (['SQL Server 18', 'SQL Server 13'], '{SQL Server 18}'),
+        (['SQL Server', 'SQL Server 1'], '{SQL Server 1}'),
+        (['SQL Server', 'MySQL'], '{SQL Server}'),
     ],
     ids=[
         'FreeTDS over sql server',
@@ -293,8 +600,8 @@ def test_find_driver(monkeypatch, dbtype, keys, expect):
         'Only match sql server drivers',
     ],
 )
-def test_find_driver_mssql(monkeypatch, keys, expect):
-    assert_driver(monkeypatch, keys, expect, 'mssql')
+def test_find_driver_mssql(monkeypatch, sections, expect):
+    assert_driver(monkeypatch, sections, expect, 'mssql')
 
 
 @pytest.mark.parametrize(
@@ -333,11 +640,14 @@ def test_dsn_config_error(config):
 )
 def test_dsn_config(config, drivers):
     parsed = get_config(config)
-    connstr = connection_string(parsed).lower() + ';'
-    assert 'dsn' in connstr
-    for key, value in config.items():
-        key = ARG_MAPPING[key]
-        assert '{}={};'.format(key, value) in connstr
+    # One split and a set comparison instead of a substring scan per key
+    parts = set(connection_string(parsed).lower().split(';'))
+    expect = {
+        '{}={}'.format(ARG_MAPPING[key], value)
+        for key, value in config.items()
+    }
+    assert any(part.startswith('dsn=') for part in parts)
+    assert expect.issubset(parts)
 
 
 def assert_in_config(key, value, config):
@@ -348,7 +658,7 @@ def assert_in_config(key, value, config):
 
 
 def test_odbc_opts(drivers):
-    config = PARAM_CONFIG.copy()
+    config = _param()
     opts = {'ansinpw': 1, 'tds_version': '7.0'}
     config['odbc_opts'] = opts
     assert_in_config('ansinpw', 1, config)
@@ -356,7 +666,7 @@ def test_odbc_opts(drivers):
 
 
 def test_odbc_opts_config(drivers):
-    config = PARAM_CONFIG.copy()
+    config = _param()
     opts = {'ansinpw': 1, 'tds_version': '7.0'}
     config['config'] = {'odbc_opts': opts}
     assert_in_config('ansinpw', 1, config)
@@ -373,7 +683,7 @@ def test_odbc_opts_config(drivers):
 
 
 def test_oracle_string(drivers):
-    config = PARAM_CONFIG.copy()
+    config = _param()
     config['dbtype'] = 'oracle'
     parsed = get_config(config)
     for key, value in config.items():
@@ -390,7 +700,7 @@ def test_oracle_string(drivers):
 
 
 def test_oracle_string_port(drivers):
-    config = PARAM_CONFIG.copy()
+    config = _param()
     config['dbtype'] = 'oracle'
     config['port'] = 12345
 
@@ -421,11 +731,21 @@ def test_connection_string_emptydrivers():
     assert string in ('driver=d;server=s', 'server=s;driver=d')
 
 
+def test_connection_string_empty_values():
+    """
+    Check that empty values are left out of the connection string.
+    """
+    config = {'driver': 'd', 'server': 's', 'port': None, 'uid': ''}
+    string = connection_string(config).lower()
+    assert 'port' not in string
+    assert 'uid' not in string
+
+
 def test_connection_string_mssql(drivers):
     """
     Check that some keys are present in a mssql connection string.
     """
-    driver = sql_query.DRIVERS['mssql']
+    driver = drivers['mssql']
     string = connection_string({'driver': driver, 'uid': 'someuser'}).lower()
     assert 'driver={}'.format(driver) in string
     assert 'uid=someuser' in string
@@ -437,34 +757,31 @@ def test_connection_string_mssql(drivers):
     assert 'disable loopback check=yes' in string
 
 
-def test_row_to_dict():
-    class Row:
-        def __init__(self, values):
-            self.values = values
-            self._iter = iter(self.values)
-
-        def __iter__(self):
-            return iter(self.values)
+def test_execute_query_results():
+    """
+    Check that rows come back as dictionaries keyed by column name.
+    """
 
-    row = Row(['value1', 'value2'])
-    row.cursor_description = (('col1', ''), ('col2', ''))
+    class RowCursor(FakeCursor):
+        def execute(self, query, *args):
+            self.description = (('col1', None), ('col2', None))
+            batches = [[('value1', 'value2')], []]
+            self.fetchmany = lambda size: batches.pop(0)
 
-    assert row_to_dict(None) is None
-    assert row_to_dict(row) == {'col1': 'value1', 'col2': 'value2'}
+    results, modified = sql_query.execute_query(RowCursor(), 'select', [])
+    assert results == [{'col1': 'value1', 'col2': 'value2'}]
+    assert modified is False
 
 
-def assert_run_module(capsys, changed, output=None, msg=None):
+def assert_run_module(module, changed, output=None, msg=None):
     """
-    Invoke run_module() and check its output. It should write a JSON object to
-    stdout with specific values for results and changed.
+    Invoke run_module() and check the result the module would have
+    serialized, without round-tripping it through stdout.
     """
-    failure = msg is None
-    with pytest.raises(SystemExit) as exit_code:
+    with pytest.raises(_ModuleExit):
         sql_query.run_module()
-        assert int(exit_code.value) == failure
 
-    captured = capsys.readouterr()
-    out = json.loads(captured.out)
+    out = module.result
     assert out['changed'] is changed
     if output is not None:
         assert out['output'] == output
@@ -498,30 +815,63 @@ def test_setup_module(monkeypatch, tmp_path):
         for k, v in module.params.items()
         if v is not None or k in module_args
     }
-    assert parsed == module_args
+    expect = dict(
+        module_args,
+        fetch_batch_size=sql_query.DEFAULT_BATCH_SIZE,
+        pool_size=10,
+        merge_batch=False,
+    )
+    assert parsed == expect
 
 
-def test_run_module(monkeypatch, capsys):
+def test_run_module(monkeypatch, drivers):
     changed = True
     results = ['results']
     call_log = []
 
-    def fake_run_query(query, values, config):
-        call_log.append((query, values, config))
+    def fake_run_query(query, values, config, batch_size, values_batch=None):
+        call_log.append((query, values, config, batch_size))
         return results, changed
 
     config = {'query': 'drop table where name like ?', 'values': ['%%']}
     config.update(PARAM_CONFIG)
-    monkeypatch.setattr(sql_query, 'setup_module', lambda: FakeModule(config))
+    module = FakeModule(config)
+    monkeypatch.setattr(sql_query, 'setup_module', lambda: module)
     monkeypatch.setattr(sql_query, 'run_query', fake_run_query)
-    assert_run_module(capsys, changed, output=results)
+    monkeypatch.setattr(sql_query, 'find_drivers', lambda: None)
+    assert_run_module(module, changed, output=results)
+
+    expect_config = _internal()
+    expect_config['driver'] = drivers[config['dbtype']]
+    batch = sql_query.DEFAULT_BATCH_SIZE
+    expect = (config['query'], config['values'], expect_config, batch)
+    assert call_log == [expect]
+
+
+def test_run_module_queries(monkeypatch, drivers):
+    changed = True
+    results = [['result1'], ['result2']]
+    call_log = []
 
-    expect_config = INTERNAL_CONFIG.copy()
-    expect_config['driver'] = sql_query.DRIVERS[config['dbtype']]
-    assert call_log == [(config['query'], config['values'], expect_config)]
+    def fake_run_queries(queries, config, batch_size, merge_batch=False):
+        call_log.append((queries, config, batch_size))
+        return results, changed
+
+    config = {'queries': ['select 1', 'select 2']}
+    config.update(PARAM_CONFIG)
+    module = FakeModule(config)
+    monkeypatch.setattr(sql_query, 'setup_module', lambda: module)
+    monkeypatch.setattr(sql_query, 'run_queries', fake_run_queries)
+    monkeypatch.setattr(sql_query, 'find_drivers', lambda: None)
+    assert_run_module(module, changed, output=results)
+
+    expect_config = _internal()
+    expect_config['driver'] = drivers[config['dbtype']]
+    batch_size = sql_query.DEFAULT_BATCH_SIZE
+    assert call_log == [(config['queries'], expect_config, batch_size)]
 
 
-def test_run_module_check_mode(monkeypatch, capsys):
+def test_run_module_check_mode(monkeypatch):
     config = {
         'query': 'drop table where name like ?',
         'values': ['%%'],
@@ -531,29 +881,31 @@ def test_run_module_check_mode(monkeypatch, capsys):
     module = FakeModule(config)
     module.check_mode = True
     monkeypatch.setattr(sql_query, 'setup_module', lambda: module)
-    assert_run_module(capsys, False, output='')
+    assert_run_module(module, False, output='')
 
 
-def test_run_module_exception(monkeypatch, capsys):
+def test_run_module_exception(monkeypatch, drivers):
     """
     Test run_module() when an exception is raised.
     """
     changed = False
     error_msg = 'this is an error'
 
-    def fake_run_query(query, values, config):
+    def fake_run_query(query, values, config, batch_size, values_batch=None):
         raise ModuleError(error_msg)
 
     config = {'query': 'drop table where name like ?', 'values': ['%%']}
     config.update(PARAM_CONFIG)
-    monkeypatch.setattr(sql_query, 'setup_module', lambda: FakeModule(config))
+    module = FakeModule(config)
+    monkeypatch.setattr(sql_query, 'setup_module', lambda: module)
+    monkeypatch.setattr(sql_query, 'find_drivers', lambda: None)
 
-    # Raising a ModuleError should only print the error msg
+    # Raising a ModuleError should only report the error msg
     monkeypatch.setattr(sql_query, 'run_query', fake_run_query)
-    assert_run_module(capsys, changed, msg=error_msg)
+    assert_run_module(module, changed, msg=error_msg)
 
-    # Raising any other kind of error should print both the error type and its
-    # message
+    # Raising any other kind of error should report both the error type and
+    # its message
     expect_msg = '{}: {}'.format(pyodbc.Error, 'pyodbc error')
     monkeypatch.setattr(sql_query, 'run_query', raise_error)
-    assert_run_module(capsys, changed, msg=expect_msg)
+    assert_run_module(module, changed, msg=expect_msg)